@@ -1,3 +1,5 @@
+import math
+import functools
 from textwrap import dedent
 import scipy.signal
 import numpy as np
@@ -32,6 +34,7 @@ class IIRfilter(object):
         self.passband_gain = passband_gain
 
     def __str__(self):
+        b, a = self.generate_coefficients()
         filter_info = dedent("""
         ------------------------------
         type: {type}
@@ -52,8 +55,8 @@ class IIRfilter(object):
         """.format(type = self.filter_type, 
         G=self.G, Q=self.Q, fc=self.fc, rate=self.rate,
         passband_gain=self.passband_gain, 
-        _b0=self.b[0], _b1=self.b[1], _b2=self.b[2], 
-        _a0=self.a[0], _a1=self.a[1], _a2=self.a[2]))
+        _b0=b[0], _b1=b[1], _b2=b[2], 
+        _a0=a[0], _a1=a[1], _a2=a[2]))
 
         return filter_info
 
@@ -84,90 +87,53 @@ class IIRfilter(object):
         a : ndarray
             Denominator filter coefficients stored as [a0, a1, a2]
         """
-        A  = 10**(self.G/40.0)
-        w0 = 2.0 * np.pi * (self.fc / self.rate)
-        alpha = np.sin(w0) / (2.0 * self.Q)
-
-        if self.filter_type == 'high_shelf':
-            b0 =      A * ( (A+1) + (A-1) * np.cos(w0) + 2 * np.sqrt(A) * alpha )
-            b1 = -2 * A * ( (A-1) + (A+1) * np.cos(w0)                          )
-            b2 =      A * ( (A+1) + (A-1) * np.cos(w0) - 2 * np.sqrt(A) * alpha )
-            a0 =            (A+1) - (A-1) * np.cos(w0) + 2 * np.sqrt(A) * alpha
-            a1 =      2 * ( (A-1) - (A+1) * np.cos(w0)                          )
-            a2 =            (A+1) - (A-1) * np.cos(w0) - 2 * np.sqrt(A) * alpha
-        elif self.filter_type == 'low_shelf':
-            b0 =      A * ( (A+1) - (A-1) * np.cos(w0) + 2 * np.sqrt(A) * alpha )
-            b1 =  2 * A * ( (A-1) - (A+1) * np.cos(w0)                          )
-            b2 =      A * ( (A+1) - (A-1) * np.cos(w0) - 2 * np.sqrt(A) * alpha )
-            a0 =            (A+1) + (A-1) * np.cos(w0) + 2 * np.sqrt(A) * alpha
-            a1 =     -2 * ( (A-1) + (A+1) * np.cos(w0)                          )
-            a2 =            (A+1) + (A-1) * np.cos(w0) - 2 * np.sqrt(A) * alpha
-        elif self.filter_type == 'high_pass':
-            b0 =  (1 + np.cos(w0))/2
-            b1 = -(1 + np.cos(w0))
-            b2 =  (1 + np.cos(w0))/2
-            a0 =   1 + alpha
-            a1 =  -2 * np.cos(w0)
-            a2 =   1 - alpha
-        elif self.filter_type == 'low_pass':
-            b0 =  (1 - np.cos(w0))/2
-            b1 =  (1 - np.cos(w0))
-            b2 =  (1 - np.cos(w0))/2
-            a0 =   1 + alpha
-            a1 =  -2 * np.cos(w0)
-            a2 =   1 - alpha
-        elif self.filter_type == 'peaking':
-            b0 =   1 + alpha * A
-            b1 =  -2 * np.cos(w0)
-            b2 =   1 - alpha * A
-            a0 =   1 + alpha / A
-            a1 =  -2 * np.cos(w0)
-            a2 =   1 - alpha / A
-        elif self.filter_type == 'notch':
-            b0 =   1 
-            b1 =  -2 * np.cos(w0)
-            b2 =   1
-            a0 =   1 + alpha
-            a1 =  -2 * np.cos(w0)
-            a2 =   1 - alpha
-        elif self.filter_type == 'high_shelf_DeMan':
-            K  = np.tan(np.pi * self.fc / self.rate) 
-            Vh = np.power(10.0, self.G / 20.0)
-            Vb = np.power(Vh, 0.499666774155)
-            a0_ = 1.0 + K / self.Q + K * K
-            b0 = (Vh + Vb * K / self.Q + K * K) / a0_
-            b1 =  2.0 * (K * K -  Vh) / a0_
-            b2 = (Vh - Vb * K / self.Q + K * K) / a0_
-            a0 =  1.0
-            a1 =  2.0 * (K * K - 1.0) / a0_
-            a2 = (1.0 - K / self.Q + K * K) / a0_
-        elif self.filter_type == 'high_pass_DeMan':
-            K  = np.tan(np.pi * self.fc / self.rate)
-            a0 =  1.0
-            a1 =  2.0 * (K * K - 1.0) / (1.0 + K / self.Q + K * K)
-            a2 = (1.0 - K / self.Q + K * K) / (1.0 + K / self.Q + K * K)
-            b0 =  1.0
-            b1 = -2.0
-            b2 =  1.0
-        else:
-            raise ValueError("Invalid filter type", self.filter_type)            
-
-        return np.array([b0, b1, b2])/a0, np.array([a0, a1, a2])/a0
-
-    def apply_filter(self, data):
+        # key the cache on plain floats so numpy scalars and 0-d arrays are hashable
+        b, a = _biquad_coefficients(float(self.G), float(self.Q), float(self.fc), float(self.rate), self.filter_type)
+        return b.copy(), a.copy() # the cached arrays are shared, so hand out copies
+
+    def apply_filter(self, data, zi=None):
         """ Apply the IIR filter to an input signal.
 
+        Multichannel input is filtered along the first axis, so all
+        channels are processed in a single call. Long or live signals can be
+        filtered in consecutive chunks by passing the state returned for
+        one chunk as the initial state of the next.
+
         Params
         -------
         data : ndarrary
-            Input audio data.
+            Input audio data with shape (samples, ch) or (samples,).
+        zi : ndarray, optional
+            Initial filter state with shape (1, 2, ch), or (1, 2) for mono
+            audio. Use zeros to start a new stream. When given, the final
+            filter state is returned along with the filtered signal.
 
         Returns
         -------
         filtered_signal : ndarray
             Filtered input audio.
+        zf : ndarray
+            Final filter state, only returned when `zi` is given.
         """
-        return self.passband_gain * scipy.signal.lfilter(self.b, self.a, data)
+        sos = self.sos[np.newaxis,:]
+        if zi is None:
+            return scipy.signal.sosfilt(sos, data, axis=0)
+        return scipy.signal.sosfilt(sos, data, axis=0, zi=zi)
+
+    @property
+    def sos(self):
+        """ Second-order section representation of the filter.
+
+        The passband gain is folded into the numerator so that the row
+        can be stacked with other sections and applied with `scipy.signal.sosfilt`.
+
+        Returns
+        -------
+        sos : ndarray
+            Filter coefficients stored as [b0, b1, b2, a0, a1, a2]
+        """
+        b, a = self.generate_coefficients()
+        return np.concatenate([self.passband_gain * b, a])
 
     @property
     def a(self):
@@ -176,4 +142,98 @@ class IIRfilter(object):
     @property
     def b(self):
         return self.generate_coefficients()[0]
-    
+
+
+@functools.lru_cache(maxsize=128)
+def _biquad_coefficients(G, Q, fc, rate, filter_type):
+    """ Compute normalized biquad coefficients for a set of filter parameters.
+
+    Coefficients depend only on the filter parameters, so results are cached
+    and shared between all filters (and meters) built with the same design.
+    See `IIRfilter.generate_coefficients` for details on the filter types.
+
+    Returns
+    -------
+    b : ndarray
+        Numerator filter coefficients stored as [b0, b1, b2]
+    a : ndarray
+        Denominator filter coefficients stored as [a0, a1, a2]
+    """
+    A  = 10**(G/40.0)
+    w0 = 2.0 * math.pi * (fc / rate)
+    alpha = math.sin(w0) / (2.0 * Q)
+    cos_w0 = math.cos(w0)
+    sqrt_A = math.sqrt(A)
+
+    if filter_type == 'high_shelf':
+        b0 =      A * ( (A+1) + (A-1) * cos_w0 + 2 * sqrt_A * alpha )
+        b1 = -2 * A * ( (A-1) + (A+1) * cos_w0                      )
+        b2 =      A * ( (A+1) + (A-1) * cos_w0 - 2 * sqrt_A * alpha )
+        a0 =            (A+1) - (A-1) * cos_w0 + 2 * sqrt_A * alpha
+        a1 =      2 * ( (A-1) - (A+1) * cos_w0                      )
+        a2 =            (A+1) - (A-1) * cos_w0 - 2 * sqrt_A * alpha
+    elif filter_type == 'low_shelf':
+        b0 =      A * ( (A+1) - (A-1) * cos_w0 + 2 * sqrt_A * alpha )
+        b1 =  2 * A * ( (A-1) - (A+1) * cos_w0                      )
+        b2 =      A * ( (A+1) - (A-1) * cos_w0 - 2 * sqrt_A * alpha )
+        a0 =            (A+1) + (A-1) * cos_w0 + 2 * sqrt_A * alpha
+        a1 =     -2 * ( (A-1) + (A+1) * cos_w0                      )
+        a2 =            (A+1) + (A-1) * cos_w0 - 2 * sqrt_A * alpha
+    elif filter_type == 'high_pass':
+        b0 =  (1 + cos_w0)/2
+        b1 = -(1 + cos_w0)
+        b2 =  (1 + cos_w0)/2
+        a0 =   1 + alpha
+        a1 =  -2 * cos_w0
+        a2 =   1 - alpha
+    elif filter_type == 'low_pass':
+        b0 =  (1 - cos_w0)/2
+        b1 =  (1 - cos_w0)
+        b2 =  (1 - cos_w0)/2
+        a0 =   1 + alpha
+        a1 =  -2 * cos_w0
+        a2 =   1 - alpha
+    elif filter_type == 'peaking':
+        b0 =   1 + alpha * A
+        b1 =  -2 * cos_w0
+        b2 =   1 - alpha * A
+        a0 =   1 + alpha / A
+        a1 =  -2 * cos_w0
+        a2 =   1 - alpha / A
+    elif filter_type == 'notch':
+        b0 =   1 
+        b1 =  -2 * cos_w0
+        b2 =   1
+        a0 =   1 + alpha
+        a1 =  -2 * cos_w0
+        a2 =   1 - alpha
+    elif filter_type == 'high_shelf_DeMan':
+        K  = math.tan(math.pi * fc / rate) 
+        Vh = math.pow(10.0, G / 20.0)
+        Vb = math.pow(Vh, 0.499666774155)
+        a0_ = 1.0 + K / Q + K * K
+        b0 = (Vh + Vb * K / Q + K * K) / a0_
+        b1 =  2.0 * (K * K -  Vh) / a0_
+        b2 = (Vh - Vb * K / Q + K * K) / a0_
+        a0 =  1.0
+        a1 =  2.0 * (K * K - 1.0) / a0_
+        a2 = (1.0 - K / Q + K * K) / a0_
+    elif filter_type == 'high_pass_DeMan':
+        K  = math.tan(math.pi * fc / rate)
+        a0 =  1.0
+        a1 =  2.0 * (K * K - 1.0) / (1.0 + K / Q + K * K)
+        a2 = (1.0 - K / Q + K * K) / (1.0 + K / Q + K * K)
+        b0 =  1.0
+        b1 = -2.0
+        b2 =  1.0
+    else:
+        raise ValueError("Invalid filter type", filter_type)            
+
+    b = np.array([b0, b1, b2])/a0
+    a = np.array([a0, a1, a2])/a0
+
+    # cached arrays are shared between filters so they must not be modified
+    b.setflags(write=False)
+    a.setflags(write=False)
+
+    return b, a
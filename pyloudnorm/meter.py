@@ -1,5 +1,6 @@
-import warnings
+import concurrent.futures
 import numpy as np
+import scipy.signal
 from . import util
 from .iirfilter import IIRfilter
 
@@ -23,10 +24,13 @@ class Meter(object):
         Gating block size in seconds.
     """
 
+    _overlap = 0.75 # overlap of 75% of the gating block duration
+
     def __init__(self, rate, filter_class="K-weighting", block_size=0.400):
         self.rate = rate
         self.filter_class = filter_class
         self.block_size = block_size
+        self.reset()
 
     def integrated_loudness(self, data):
         """ Measure the integrated gated loudness of a signal.
@@ -49,8 +53,8 @@ class Meter(object):
         LUFS : float
             Integrated gated loudness of the input measured in dB LUFS.
         """
-        input_data = data.copy()
-        util.valid_audio(input_data, self.rate, self.block_size)
+        util.valid_audio(data, self.rate, self.block_size)
+        input_data = data
 
         if input_data.ndim == 1:
             input_data = np.reshape(input_data, (input_data.shape[0], 1))
@@ -58,57 +62,211 @@ class Meter(object):
         numChannels = input_data.shape[1]
         numSamples  = input_data.shape[0]
 
+        # work in a planar (channels, samples) layout so each channel is contiguous in memory
+        input_data = input_data.T
+
         # Apply frequency weighting filters - account for the acoustic response of the head and auditory system
-        for (filter_class, filter_stage) in self._filters.items():
-            for ch in range(numChannels):
-                input_data[:,ch] = filter_stage.apply_filter(input_data[:,ch])
+        if self._filters:
+            # coefficients stay in double precision, at high sample rates the poles of the
+            # high-pass sit so close to the unit circle that float32 coefficients shift its response
+            input_data = scipy.signal.sosfilt(self._weighting_sos(), input_data, axis=-1) # filter all channels at once (returns a new array)
+        else:
+            input_data = input_data.copy() # never modify the caller's data below
 
-        G = [1.0, 1.0, 1.0, 1.41, 1.41] # channel gains
         T_g = self.block_size # 400 ms gating block standard
-        Gamma_a = -70.0 # -70 LKFS = absolute loudness threshold
-        overlap = 0.75 # overlap of 75% of the block duration
-        step = 1.0 - overlap # step size by percentage
+        step = 1.0 - self._overlap # step size by percentage
 
         T = numSamples / self.rate # length of the input in seconds
         numBlocks = int(np.round(((T - T_g) / (T_g * step)))+1) # total number of gated blocks (see end of eq. 3)
-        j_range = np.arange(0, numBlocks) # indexed list of total blocks
-        z = np.zeros(shape=(numChannels,numBlocks)) # instantiate array - trasponse of input
-
-        for i in range(numChannels): # iterate over input channels
-            for j in j_range: # iterate over total frames
-                l = int(T_g * (j * step    ) * self.rate) # lower bound of integration (in samples)
-                u = int(T_g * (j * step + 1) * self.rate) # upper bound of integration (in samples)
-                # caluate mean square of the filtered for each block (see eq. 1)
-                z[i,j] = (1.0 / (T_g * self.rate)) * np.sum(np.square(input_data[l:u,i]))
-
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=RuntimeWarning)
-            # loudness for each jth block (see eq. 4)
-            l = [-0.691 + 10.0 * np.log10(np.sum([G[i] * z[i,j] for i in range(numChannels)])) for j in j_range]
+        step_samples, block_samples = self._block_lengths()
+        l = np.arange(0, numBlocks) * step_samples # lower bounds of integration (in samples)
+        u = np.minimum(l + block_samples, numSamples) # upper bounds, the final block may extend past the end of the input
+
+        # running sum of the squared samples so each block energy is a single difference
+        # accumulate in at least double precision, which is needed over long inputs
+        energy = np.zeros(shape=(numChannels, numSamples + 1), dtype=np.promote_types(input_data.dtype, np.float64))
+        np.square(input_data, out=input_data) # input_data is a private working array, square it in place
+        np.cumsum(input_data, axis=1, dtype=energy.dtype, out=energy[:,1:])
+
+        # caluate mean square of the filtered for each block (see eq. 1)
+        z = (energy[:,u] - energy[:,l]) / block_samples # shape (numChannels, numBlocks)
+
+        return self._gated_loudness(z)
+
+    def reset(self):
+        """ Reset the streaming loudness measurement.
+
+        Clears the filter state and the gating blocks accumulated by
+        `update`, so that the next call begins measuring a new stream.
+        The weighting filters are fixed at the start of each stream,
+        so call this after changing the filters of a meter mid-stream.
+        """
+        self._stream_sos = None # weighting filters of the current stream
+        self._stream_zi = None # filter state carried over between chunks
+        self._stream_tail = None # squared, filtered samples of the blocks still in progress
+        self._stream_z = None # mean square of every completed block, grown by doubling
+        self._stream_count = 0 # number of completed blocks held in _stream_z
+
+    def update(self, data):
+        """ Measure the integrated gated loudness of a stream chunk by chunk.
+
+        The filter state and the samples of any incomplete gating block are
+        kept between calls, so each call only processes the new samples.
+        This allows live metering, or measuring long files without holding
+        them in memory. Only complete blocks are gated, so the result can
+        differ slightly from `integrated_loudness` at the end of a signal.
+        Call `reset` to begin measuring a new stream.
+
+        Params
+        -------
+        data : ndarray
+            Next chunk of input audio data with shape (samples, ch) or (samples,).
+            Chunks can have any length, but the number of channels must not change.
+
+        Returns
+        -------
+        LUFS : float
+            Integrated gated loudness of the stream so far measured in dB LUFS.
+        """
+        util.valid_audio(data, self.rate, 0.0) # chunks may be shorter than a block
+
+        input_data = data
+        if input_data.ndim == 1:
+            input_data = np.reshape(input_data, (input_data.shape[0], 1))
+
+        numChannels = input_data.shape[1]
+
+        if self._stream_tail is not None and numChannels != self._stream_tail.shape[0]:
+            raise ValueError("Number of channels must not change within a stream, call reset() to begin a new stream.")
+
+        if input_data.shape[0] == 0: # no new samples, e.g. an empty audio callback
+            return self._stream_loudness(numChannels)
+
+        # work in a planar (channels, samples) layout so each channel is contiguous in memory
+        input_data = input_data.T
+
+        if self._stream_tail is None: # first chunk of a new stream
+            if self._filters:
+                self._stream_sos = self._weighting_sos()
+                self._stream_zi = np.zeros((self._stream_sos.shape[0], numChannels, 2))
+            self._stream_tail = np.zeros((numChannels, 0))
+            self._stream_z = np.zeros((numChannels, 16))
+
+        # Apply frequency weighting filters, continuing from the state left by the previous chunk
+        if self._stream_sos is not None:
+            input_data, self._stream_zi = scipy.signal.sosfilt(self._stream_sos, input_data, axis=-1, zi=self._stream_zi)
+        else:
+            input_data = input_data.astype(np.float64) # never modify the caller's data below
+        np.square(input_data, out=input_data)
+
+        step_samples, block_samples = self._block_lengths()
 
-        # find gating block indices above absolute threshold
-        J_g = [j for j,l_j in enumerate(l) if l_j >= Gamma_a]
+        # continue the blocks left incomplete by the previous chunk
+        input_data = np.concatenate([self._stream_tail, input_data], axis=1)
+        numSamples = input_data.shape[1]
 
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=RuntimeWarning)
+        if numSamples >= block_samples:
+            numBlocks = (numSamples - block_samples) // step_samples + 1 # blocks completed by this chunk
+            l = np.arange(0, numBlocks) * step_samples # lower bounds of integration (in samples)
+
+            energy = np.zeros(shape=(numChannels, numSamples + 1))
+            np.cumsum(input_data, axis=1, out=energy[:,1:])
+
+            if self._stream_count + numBlocks > self._stream_z.shape[1]: # double the capacity when full
+                capacity = max(2 * self._stream_z.shape[1], self._stream_count + numBlocks)
+                z = np.zeros((numChannels, capacity))
+                z[:,:self._stream_count] = self._stream_z[:,:self._stream_count]
+                self._stream_z = z
+
+            # caluate mean square of the filtered for each block (see eq. 1)
+            self._stream_z[:,self._stream_count:self._stream_count + numBlocks] = (energy[:,l + block_samples] - energy[:,l]) / block_samples
+            self._stream_count += numBlocks
+            input_data = input_data[:,numBlocks * step_samples:]
+
+        self._stream_tail = input_data.copy() # only keep the samples still needed
+
+        return self._stream_loudness(numChannels)
+
+    def _stream_loudness(self, numChannels):
+        """ Gate every block completed so far in the current stream. """
+        if self._stream_z is None:
+            return self._gated_loudness(np.zeros(shape=(numChannels, 0)))
+
+        return self._gated_loudness(self._stream_z[:,:self._stream_count])
+
+    def _block_lengths(self):
+        """ Hop between gating blocks and length of each block (in samples). """
+        T_g = self.block_size # 400 ms gating block standard
+        step = 1.0 - self._overlap # step size by percentage
+        return int(round(T_g * step * self.rate)), int(round(T_g * self.rate))
+
+    def _weighting_sos(self):
+        """ Cascade every weighting filter stage into one set of second-order sections. """
+        return np.vstack([filter_stage.sos for filter_stage in self._filters.values()])
+
+    def _gated_loudness(self, z):
+        """ Gate the mean square of each block and compute the integrated loudness.
+
+        Params
+        -------
+        z : ndarray
+            Mean square of each block of the weighted input with shape (ch, blocks).
+
+        Returns
+        -------
+        LUFS : float
+            Integrated gated loudness measured in dB LUFS.
+        """
+        numChannels = z.shape[0]
+        G = np.array([1.0, 1.0, 1.0, 1.41, 1.41])[:numChannels] # channel gains
+        Gamma_a = -70.0 # -70 LKFS = absolute loudness threshold
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # loudness for each jth block (see eq. 4)
+            l = -0.691 + 10.0 * np.log10(G @ z)
+
+            # find gating blocks above absolute threshold
+            J_g = l >= Gamma_a
             # calculate the average of z[i,j] as show in eq. 5
-            z_avg_gated = [np.mean([z[i,j] for j in J_g]) for i in range(numChannels)]
-        # calculate the relative threshold value (see eq. 6)
-        Gamma_r = -0.691 + 10.0 * np.log10(np.sum([G[i] * z_avg_gated[i] for i in range(numChannels)])) - 10.0
-
-        # find gating block indices above relative and absolute thresholds  (end of eq. 7)
-        J_g = [j for j,l_j in enumerate(l) if (l_j > Gamma_r and l_j > Gamma_a)]
-        with warnings.catch_warnings():
-            warnings.simplefilter("ignore", category=RuntimeWarning)
+            z_avg_gated = np.mean(z[:,J_g], axis=1) if J_g.any() else np.zeros(numChannels)
+            # calculate the relative threshold value (see eq. 6)
+            Gamma_r = -0.691 + 10.0 * np.log10(G @ z_avg_gated) - 10.0
+
+            # find gating blocks above relative and absolute thresholds  (end of eq. 7)
+            J_g = (l > Gamma_r) & (l > Gamma_a)
             # calculate the average of z[i,j] as show in eq. 7 with blocks above both thresholds
-            z_avg_gated = np.nan_to_num(np.array([np.mean([z[i,j] for j in J_g]) for i in range(numChannels)]))
+            # if no blocks pass the gates the signal is treated as silent
+            z_avg_gated = np.mean(z[:,J_g], axis=1) if J_g.any() else np.zeros(numChannels)
 
-        # calculate final loudness gated loudness (see eq. 7)
-        with np.errstate(divide='ignore'):
-            LUFS = -0.691 + 10.0 * np.log10(np.sum([G[i] * z_avg_gated[i] for i in range(numChannels)]))
+            # calculate final loudness gated loudness (see eq. 7)
+            LUFS = -0.691 + 10.0 * np.log10(G @ z_avg_gated)
 
         return LUFS
 
+    def integrated_loudness_batch(self, data, num_workers=None):
+        """ Measure the integrated gated loudness of a batch of signals.
+
+        Each signal is measured independently with `integrated_loudness`.
+        The filtering and block energy computations release the GIL, so
+        the signals are processed concurrently in a pool of threads.
+
+        Params
+        -------
+        data : list of ndarray
+            Input audio signals, each with shape (samples, ch) or (samples,).
+            Signals may differ in length and number of channels.
+        num_workers : int, optional
+            Maximum number of worker threads. Defaults to the
+            `concurrent.futures.ThreadPoolExecutor` default.
+
+        Returns
+        -------
+        LUFS : ndarray
+            Integrated gated loudness of each input measured in dB LUFS.
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+            return np.array(list(executor.map(self.integrated_loudness, data)))
+
     @property
     def filter_class(self):
         return self._filter_class
@@ -125,7 +283,7 @@ class Meter(object):
             self._filters['high_pass'] = IIRfilter(0.0, 0.5, 130.0, self.rate, 'high_pass')
             self._filters['peaking'] = IIRfilter(0.0, 1/np.sqrt(2), 500.0, self.rate, 'peaking')
         elif self._filter_class == "Fenton/Lee 2": # not yet implemented
-            self._filters['high_self'] = IIRfilter(4.0, 1/np.sqrt(2), 1500.0, self.rate, 'high_shelf')
+            self._filters['high_shelf'] = IIRfilter(4.0, 1/np.sqrt(2), 1500.0, self.rate, 'high_shelf')
             self._filters['high_pass'] = IIRfilter(0.0, 0.5, 38.0, self.rate, 'high_pass')
         elif self._filter_class == "Dash et al.":
             self._filters['high_pass'] = IIRfilter(0.0, 0.375, 149.0, self.rate, 'high_pass')
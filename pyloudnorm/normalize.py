@@ -2,7 +2,7 @@ import warnings
 import numpy as np
 
 
-def peak(data, target):
+def peak(data, target, out=None):
     """ Peak normalize a signal.
     
     Normalize an input signal to a user specifed peak amplitude.   
@@ -13,6 +13,9 @@ def peak(data, target):
         Input multichannel audio data.
     target : float
         Desired peak amplitude in dB.
+    out : ndarray, optional
+        Array in which to place the output, which may be `data` itself
+        to normalize in place without allocating a new array.
 
     Returns
     -------
@@ -24,15 +27,16 @@ def peak(data, target):
 
     # calculate the gain needed to scale to the desired peak level
     gain = np.power(10.0, target/20.0) / current_peak
-    output = gain * data
-    
-    # check for potentially clipped samples
-    if np.max(np.abs(output)) >= 1.0:
+
+    # check for potentially clipped samples (the output peak is the scaled input peak)
+    if gain * current_peak >= 1.0:
         warnings.warn("Possible clipped samples in output.")
 
+    output = np.multiply(data, gain, out=out)
+
     return output
 
-def loudness(data, input_loudness, target_loudness):
+def loudness(data, input_loudness, target_loudness, out=None):
     """ Loudness normalize a signal.
     
     Normalize an input signal to a user loudness in dB LKFS.   
@@ -45,6 +49,9 @@ def loudness(data, input_loudness, target_loudness):
         Loudness of the input in dB LUFS. 
     target_loudness : float
         Target loudness of the output in dB LUFS.
+    out : ndarray, optional
+        Array in which to place the output, which may be `data` itself
+        to normalize in place without allocating a new array.
         
     Returns
     -------
@@ -55,10 +62,10 @@ def loudness(data, input_loudness, target_loudness):
     delta_loudness = target_loudness - input_loudness
     gain = np.power(10.0, delta_loudness/20.0)
 
-    output = gain * data
-
-    # check for potentially clipped samples
-    if np.max(np.abs(output)) >= 1.0:
+    # check for potentially clipped samples (the output peak is the scaled input peak)
+    if gain * np.max(np.abs(data)) >= 1.0:
         warnings.warn("Possible clipped samples in output.")
 
+    output = np.multiply(data, gain, out=out)
+
     return output
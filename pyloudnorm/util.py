@@ -23,7 +23,7 @@ def valid_audio(data, rate, block_size):
     if not isinstance(data, np.ndarray):
         raise ValueError("Data must be of type numpy.ndarray.")
     
-    if not np.issubdtype(data.dtype, np.floating):
+    if data.dtype.kind != 'f':
         raise ValueError("Data must be floating point.")
 
     if data.ndim == 2 and data.shape[1] > 5:
@@ -6,7 +6,7 @@ DESCRIPTION = "Implementation of ITU-R BS.1770-4 loudness algorithm in Python"
 URL = "https://github.com/csteinmetz1/pyloudnorm"
 EMAIL = "c.j.steinmetz@qmul.ac.uk"
 AUTHOR = "Christian Steinmetz"
-REQUIRES_PYTHON = ">=3.0"
+REQUIRES_PYTHON = ">=3.5"
 VERSION = "0.1.1"
 
 HERE = Path(__file__).parent